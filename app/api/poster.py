@@ -1,9 +1,9 @@
 import logging
+import orjson
 from fastapi import APIRouter, Request, HTTPException, Depends
+from fastapi.responses import ORJSONResponse
 from app.poster.generator import PosterGenerator
-from app.services.wordpress_service import WordPressService
-from app.services.openai_service import OpenAIService
-from app.services.image_service import ImageService
+from app.core.cache import AsyncTTLCache
 from app.core.rate_limiter import rate_limiter
 from app.core.config import settings
 
@@ -11,22 +11,37 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Identical payloads posted while one is still being generated share its result
+_inflight_posters = AsyncTTLCache(ttl=0)
+
+def get_poster_generator(request: Request) -> PosterGenerator:
+    # Built once in the app lifespan, see app.main
+    return request.app.state.poster_generator
+
 @router.post("")
 async def generate_poster(
     request: Request,
-    _=Depends(rate_limiter)
+    generator: PosterGenerator = Depends(get_poster_generator),
+    rate_limit_check=Depends(rate_limiter)
 ):
-    payload = await request.json()
-    logger.info(f"Received poster generation request: {payload}")
     try:
-        generator = PosterGenerator(
-            openai_service=OpenAIService(),
-            wordpress_service=WordPressService(),
-            image_service=ImageService()
-        )
-        poster_urls = await generator.generate(payload)
-        logger.info(f"Poster(s) generated and uploaded: {poster_urls}")
-        return {"poster_urls": poster_urls}
+        body = await request.body()
+        payload = orjson.loads(body)
+    finally:
+        # The rate-limit round trip overlaps with reading the body
+        if rate_limit_check:
+            await rate_limit_check
+    # Formatting the whole payload is only worth it when debugging
+    if settings.DEBUG:
+        logger.info("Received poster generation request: %s", payload)
+    else:
+        logger.info("Received poster generation request (%d bytes)", len(body))
+    try:
+        key = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+        poster_urls = await _inflight_posters.get_or_set(key, lambda: generator.generate(payload))
+        logger.info("Poster(s) generated and uploaded: %s", poster_urls)
+        # Returning the response directly skips FastAPI's jsonable_encoder pass
+        return ORJSONResponse({"poster_urls": poster_urls})
     except Exception as e:
-        logger.error(f"Poster generation failed: {e}", exc_info=True)
+        logger.error("Poster generation failed: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
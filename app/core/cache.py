@@ -0,0 +1,35 @@
+import asyncio
+import time
+
+# Small in-process cache for coroutine results, with a per-entry TTL.
+# Concurrent misses for the same key share one in-flight task instead of
+# each issuing their own request. With ttl=0 nothing is kept once the task
+# finishes, so the cache only coalesces concurrent calls.
+class AsyncTTLCache:
+    def __init__(self, ttl, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = {}
+        self._inflight = {}
+
+    async def get_or_set(self, key, factory):
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._store(key, t))
+        # Shield so one cancelled caller doesn't cancel the lookup for everyone else
+        return await asyncio.shield(task)
+
+    def _store(self, key, task):
+        self._inflight.pop(key, None)
+        if self.ttl <= 0 or task.cancelled() or task.exception() is not None:
+            return
+        self._entries.pop(key, None)
+        if len(self._entries) >= self.maxsize:
+            # Evict the oldest entry (dicts keep insertion order)
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = (time.monotonic() + self.ttl, task.result())
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -6,6 +7,12 @@ class Settings(BaseSettings):
     API_VERSION: str = os.getenv("API_VERSION", "1.0.0")
     DEBUG: bool = os.getenv("DEBUG", "false").lower() == "true"
     RATE_LIMITER: str = os.getenv("RATE_LIMITER", "upstash")
+    RATE_LIMIT_REQUESTS: int = int(os.getenv("RATE_LIMIT_REQUESTS", "1"))
+    RATE_LIMIT_WINDOW: int = int(os.getenv("RATE_LIMIT_WINDOW", "60"))
+    TRUST_PROXY_HEADERS: bool = os.getenv("TRUST_PROXY_HEADERS", "false").lower() == "true"
+    # Number of trusted proxies in front of the app that append to X-Forwarded-For;
+    # values below 1 ignore the header
+    TRUSTED_PROXY_HOPS: int = int(os.getenv("TRUSTED_PROXY_HOPS", "1"))
     STORAGE_PROVIDER: str = os.getenv("STORAGE_PROVIDER", "wordpress")
     IMAGE_PROVIDER: str = os.getenv("IMAGE_PROVIDER", "replicate")
     TEXT_PROVIDER: str = os.getenv("TEXT_PROVIDER", "azure_openai")
@@ -16,6 +23,16 @@ class Settings(BaseSettings):
     WORDPRESS_URL: str = os.getenv("WORDPRESS_URL")
     WORDPRESS_USERNAME: str = os.getenv("WORDPRESS_USERNAME")
     WORDPRESS_PASSWORD: str = os.getenv("WORDPRESS_PASSWORD")
+    # Upper bound on media searches in flight to WordPress from one process
+    WP_SEARCH_CONCURRENCY: int = int(os.getenv("WP_SEARCH_CONCURRENCY", "8"))
+    MEDIA_CACHE_TTL: int = int(os.getenv("MEDIA_CACHE_TTL", "600"))
+    LANDMARK_CACHE_TTL: int = int(os.getenv("LANDMARK_CACHE_TTL", "86400"))
+    IMAGE_CACHE_TTL: int = int(os.getenv("IMAGE_CACHE_TTL", "3600"))
+    # Render posters in this many worker processes; 0 renders in a thread of the serving process
+    RENDER_PROCESSES: int = int(os.getenv("RENDER_PROCESSES", "0"))
+    IMAGE_CACHE_DIR: str = os.getenv("IMAGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "wpcache"))
+    # Downloaded images are evicted, oldest first, once the cache directory grows past this
+    IMAGE_CACHE_MAX_BYTES: int = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
     FONT_BOLD_PATH: str = os.path.join(os.path.dirname(__file__), "..", "fonts", "GlacialIndifference-Bold.ttf")
     FONT_REGULAR_PATH: str = os.path.join(os.path.dirname(__file__), "..", "fonts", "GlacialIndifference-Regular.ttf")
 
@@ -1,18 +1,56 @@
+import asyncio
+import logging
+import httpx
+import orjson
 from fastapi import Request, HTTPException
 from app.core.config import settings
-import httpx
-import hashlib
-import time
 
-# Simple Upstash Redis rate limiter (per IP, per minute)
+logger = logging.getLogger(__name__)
+
+# Upstash Redis fixed-window rate limiter (per IP)
 async def rate_limiter(request: Request):
     if settings.RATE_LIMITER != "upstash":
+        return None
+    # Start the check right away; the endpoint awaits the task once it has read the body
+    return asyncio.create_task(check_rate_limit(request))
+
+def client_ip(request: Request):
+    # Behind a reverse proxy every request arrives from the proxy's address, so the
+    # original client is taken from X-Forwarded-For when the proxy is trusted. Clients
+    # can put anything at the start of that header; each trusted proxy appends the
+    # address it saw, so the client is the TRUSTED_PROXY_HOPS-th entry from the right.
+    # With no hops configured (0 or less) there is no trusted entry, and addresses[-0]
+    # would be the client-controlled leftmost one, so the peer address is used instead.
+    if settings.TRUST_PROXY_HEADERS and settings.TRUSTED_PROXY_HOPS >= 1:
+        forwarded_for = request.headers.get("x-forwarded-for")
+        if forwarded_for:
+            addresses = [address.strip() for address in forwarded_for.split(",")]
+            if len(addresses) >= settings.TRUSTED_PROXY_HOPS:
+                return addresses[-settings.TRUSTED_PROXY_HOPS]
+    return request.client.host
+
+async def check_rate_limit(request: Request):
+    key = f"ratelimit:{client_ip(request)}"
+    # One MULTI/EXEC round trip: count the hit, start the window on the first hit,
+    # and read the remaining TTL for Retry-After
+    commands = [["INCR", key], ["EXPIRE", key, str(settings.RATE_LIMIT_WINDOW), "NX"], ["TTL", key]]
+    # The limiter fails open: if Upstash is unreachable, rejects the token or returns
+    # something unexpected, the request is let through rather than failed
+    try:
+        resp = await request.app.state.upstash_client.post("/multi-exec", content=orjson.dumps(commands), headers={"Content-Type": "application/json"})
+        resp.raise_for_status()
+        results = orjson.loads(resp.content)
+        count = int(results[0]["result"])
+    except (httpx.HTTPError, ValueError, TypeError, KeyError, IndexError) as e:
+        logger.warning("Rate limit check failed, allowing request: %r", e)
         return
-    ip = request.client.host
-    key = f"ratelimit:{ip}"
-    url = f"{settings.UPSTASH_REDIS_URL}/set/{key}/1/EX/60/NX"
-    headers = {"Authorization": f"Bearer {settings.UPSTASH_REDIS_TOKEN}"}
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url, headers=headers)
-        if resp.status_code == 409:
-            raise HTTPException(status_code=429, detail="Rate limit exceeded. Try again in 1 minute.")
+    if count > settings.RATE_LIMIT_REQUESTS:
+        try:
+            retry_after = max(int(results[2]["result"]), 1)
+        except (ValueError, TypeError, KeyError, IndexError):
+            retry_after = settings.RATE_LIMIT_WINDOW
+        raise HTTPException(
+            status_code=429,
+            detail=f"Rate limit exceeded. Try again in {retry_after} seconds.",
+            headers={"Retry-After": str(retry_after)}
+        )
@@ -1,6 +1,8 @@
 import re
+from functools import lru_cache
 
+_SLUG_RE = re.compile(r'[^a-z0-9]+')
+
+@lru_cache(maxsize=512)
 def slugify(text):
-    text = text.lower()
-    text = re.sub(r'[^a-z0-9]+', '-', text)
-    return text.strip('-')
+    return _SLUG_RE.sub('-', text.lower()).strip('-')
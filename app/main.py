@@ -1,21 +1,154 @@
+import asyncio
+import hashlib
 import logging
-from fastapi import FastAPI
+import multiprocessing
+import os
+import queue
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
+from contextlib import asynccontextmanager
+import httpx
+import PIL
+import orjson
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse, Response
 from app.api.poster import router as poster_router
 from app.core.config import settings
+from app.poster.generator import PosterGenerator, init_render_worker, load_fonts
+from app.services.image_service import ImageService
+from app.services.openai_service import OpenAIService
+from app.services.wordpress_service import WordPressService
 
-# Logging setup
-logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+# Logging setup: handlers on the event loop only enqueue records, and a
+# QueueListener thread does the actual (blocking) writes to stdout. The queue
+# handler is attached to the root logger in lifespan, next to starting the
+# listener, because `python -m app.main` executes this module twice (as
+# __main__ and as app.main) and only app.main's lifespan ever runs.
+log_queue = queue.Queue(-1)
+log_queue_handler = QueueHandler(log_queue)
+log_stream_handler = logging.StreamHandler(sys.stdout)
+log_stream_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+log_listener = QueueListener(log_queue, log_stream_handler, respect_handler_level=True)
+logging.getLogger().setLevel(logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title=settings.API_TITLE, version=settings.API_VERSION)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_listener.start()
+    logging.getLogger().addHandler(log_queue_handler)
+    # Shared, pooled HTTP clients so every request reuses open TCP/TLS connections
+    limits = httpx.Limits(max_keepalive_connections=20, max_connections=100)
+    app.state.wp_client = httpx.AsyncClient(
+        base_url=settings.WORDPRESS_URL or "",
+        auth=(settings.WORDPRESS_USERNAME, settings.WORDPRESS_PASSWORD),
+        http2=True,
+        timeout=30,
+        limits=limits
+    )
+    app.state.upstash_client = httpx.AsyncClient(
+        base_url=settings.UPSTASH_REDIS_URL or "",
+        headers={"Authorization": f"Bearer {settings.UPSTASH_REDIS_TOKEN}"},
+        http2=True,
+        timeout=10,
+        limits=limits
+    )
+    app.state.openai_client = httpx.AsyncClient(
+        headers={"api-key": settings.AZURE_OPENAI_API_KEY or ""},
+        http2=True,
+        timeout=60,
+        limits=httpx.Limits(max_keepalive_connections=10)
+    )
+    # Media files may live on a CDN, so downloads use a client without WordPress credentials
+    app.state.http_client = httpx.AsyncClient(http2=True, timeout=30, limits=limits, follow_redirects=True)
+    if settings.RENDER_PROCESSES > 0:
+        # Spawned rather than forked: the log listener thread and event loop must not be copied
+        app.state.render_pool = ProcessPoolExecutor(
+            max_workers=settings.RENDER_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_render_worker
+        )
+    else:
+        # Renders get their own threads, one per core, so they never queue behind
+        # (or crowd out) the image decodes and cache I/O on the default executor
+        app.state.render_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="render")
+    # The generator and its services are stateless per request, so one instance is shared
+    app.state.poster_generator = PosterGenerator(
+        openai_service=OpenAIService(app.state.openai_client),
+        wordpress_service=WordPressService(app.state.wp_client),
+        image_service=ImageService(app.state.http_client),
+        fonts=load_fonts(),
+        render_pool=app.state.render_pool
+    )
+    # Warmed in the background so startup (and the first health check) doesn't wait on
+    # WordPress; the reference keeps the task from being garbage collected mid-run
+    app.state.preload_task = asyncio.create_task(preload_assets(app))
+    logger.info("CMT Poster Generator FastAPI app started.")
+    try:
+        yield
+    finally:
+        app.state.preload_task.cancel()
+        await app.state.wp_client.aclose()
+        await app.state.upstash_client.aclose()
+        await app.state.http_client.aclose()
+        await app.state.openai_client.aclose()
+        app.state.render_pool.shutdown(cancel_futures=True)
+        logger.info("CMT Poster Generator FastAPI app stopped.")
+        logging.getLogger().removeHandler(log_queue_handler)
+        log_listener.stop()
+
+async def preload_assets(app: FastAPI):
+    # Warm the media lookup, template and icon caches so the first poster doesn't pay for them
+    try:
+        await app.state.poster_generator.preload()
+    except Exception as e:
+        logger.warning("Could not preload poster assets: %s", e)
+
+app = FastAPI(title=settings.API_TITLE, version=settings.API_VERSION, lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.include_router(poster_router, prefix="/generate-posters", tags=["Poster Generation"], include_in_schema=True)
 
-@app.on_event("startup")
-async def startup_event():
-    logger.info("CMT Poster Generator FastAPI app started.")
+# The health payload never changes, so it is serialized once at import
+HEALTH_BODY = orjson.dumps({"status": "ok", "pillow": PIL.__version__})
+HEALTH_ETAG = '"%s"' % hashlib.blake2b(HEALTH_BODY, digest_size=8).hexdigest()
+# Lets proxies in front of the app collapse bursts of load-balancer probes
+HEALTH_HEADERS = {"Cache-Control": "public, max-age=1", "ETag": HEALTH_ETAG}
+
+def etag_matches(if_none_match, etag):
+    # If-None-Match is "*" or a comma-separated list of entity tags, compared weakly
+    # (a W/ prefix on either side is ignored)
+    if not if_none_match:
+        return False
+    etag = etag.removeprefix("W/")
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
 
 @app.get("/health")
-def health_check():
+def health_check(request: Request):
     logger.info("Health check endpoint called.")
-    return {"status": "ok"}
+    # Probers that send the ETag back get an empty 304
+    if etag_matches(request.headers.get("if-none-match"), HEALTH_ETAG):
+        return Response(status_code=304, headers=HEALTH_HEADERS)
+    return Response(content=HEALTH_BODY, media_type="application/json", headers=HEALTH_HEADERS)
+
+if __name__ == "__main__":
+    import uvicorn
+    # uvloop + httptools are the fast Cython/C event loop and HTTP parser; several
+    # worker processes let CPU-bound poster rendering use every core. WEB_CONCURRENCY
+    # overrides the worker count (e.g. on Render); the reloader only supports a single
+    # process, so DEBUG runs one worker.
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=int(os.getenv("PORT", "8000")),
+        reload=settings.DEBUG,
+        loop="uvloop",
+        http="httptools",
+        workers=1 if settings.DEBUG else int(os.getenv("WEB_CONCURRENCY", str(max(2, os.cpu_count() or 1)))),
+        backlog=2048,
+        limit_concurrency=1000,
+        timeout_keep_alive=30
+    )
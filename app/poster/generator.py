@@ -1,26 +1,111 @@
-import os
-import tempfile
+import io
+import re
+import math
+import uuid
+import asyncio
+import logging
+import dateutil.parser
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 from app.services.openai_service import OpenAIService
 from app.services.wordpress_service import WordPressService
 from app.services.image_service import ImageService
+from app.core.cache import AsyncTTLCache
 from app.core.config import settings
+from app.core.utils import slugify
 from PIL import Image, ImageDraw, ImageFont
 
+logger = logging.getLogger(__name__)
+
+POSTER_SIZE = (1200, 1600)
+
+# Strips punctuation from speaker names before building media search variants
+_NAME_CLEAN_RE = re.compile(r'[^a-zA-Z0-9 ]')
+# Event details as formatted by OpenAI: 'Date: ..., Time: ..., Venue: ...'
+_DETAILS_RE = re.compile(r"Date:\s*(.*?),\s*Time:\s*(.*?),\s*Venue:\s*(.*)")
+# Pillow-SIMD is based on Pillow 9.5, which does not bound ImageFont memory for long
+# strings (CVE-2023-44271, fixed in Pillow 10.0.1), so every drawn string is capped.
+# Nothing longer than this fits on a poster anyway.
+MAX_TEXT_LENGTH = 1000
+
+# Resized icons keyed by (url, size); they are only ever pasted, so callers share them.
+# Entries expire with the image cache so a replaced icon is picked up again.
+_icon_cache = AsyncTTLCache(ttl=settings.IMAGE_CACHE_TTL, maxsize=64)
+
+# Event-independent layer (overlay + register line) keyed by (overlay_url, register_icon_url).
+# Values are (image cropped to its visible box, paste position), or None if nothing is visible.
+# Each is up to a full poster in size, so only a few are kept.
+_template_cache = AsyncTTLCache(ttl=settings.IMAGE_CACHE_TTL, maxsize=4)
+
+def clip_text(text):
+    return text[:MAX_TEXT_LENGTH]
+
+def speaker_circle_size(n):
+    # Diameter of each speaker photo for n speakers with photos
+    return 320 if n == 1 else 220 if n == 2 else 160
+
+@lru_cache(maxsize=32)
+def get_font(path, size):
+    # Parsing a TTF is relatively expensive, so each (path, size) is loaded once per process
+    return ImageFont.truetype(path, size)
+
+def load_fonts():
+    return {
+        "bold": get_font(settings.FONT_BOLD_PATH, 80),
+        "regular": get_font(settings.FONT_REGULAR_PATH, 48),
+        "small": get_font(settings.FONT_REGULAR_PATH, 32),  # Slightly smaller
+        "small_bold": get_font(settings.FONT_BOLD_PATH, 32),  # Slightly smaller
+        # Even smaller fonts for 4 speakers to reduce clutter
+        "tiny": get_font(settings.FONT_REGULAR_PATH, 24),
+        "tiny_bold": get_font(settings.FONT_BOLD_PATH, 24),
+    }
+
+@lru_cache(maxsize=4096)
+def text_width(font, text):
+    # The same words (names, organizations, boilerplate) recur across posters
+    return font.getlength(text)
+
+@lru_cache(maxsize=256)
+def wrap_text(text, font, max_width):
+    # Greedy word wrap: measure each word once and keep a running line width,
+    # instead of re-measuring every growing prefix of the line
+    space_w = text_width(font, " ")
+    lines = []
+    current = []
+    current_w = 0
+    for word in text.split():
+        word_w = text_width(font, word)
+        if current and current_w + space_w + word_w > max_width:
+            lines.append(" ".join(current))
+            current = [word]
+            current_w = word_w
+        else:
+            current_w += (space_w if current else 0) + word_w
+            current.append(word)
+    if current:
+        lines.append(" ".join(current))
+    return tuple(lines)
+
 class PosterGenerator:
-    def __init__(self, openai_service, wordpress_service, image_service):
+    def __init__(self, openai_service, wordpress_service, image_service, fonts=None, render_pool=None):
         self.openai = openai_service
         self.wp = wordpress_service
         self.imgsvc = image_service
+        self.fonts = fonts or load_fonts()
+        # Executor for render_poster: a ThreadPoolExecutor, or a ProcessPoolExecutor started
+        # with init_render_worker; None uses the event loop's default executor
+        self.render_pool = render_pool
 
     async def generate(self, payload):
-        # 1. Get landmark slug
+        # The title may be missing, null or not a string; it is drawn and used for the filename
+        title = str(payload.get("title") or "")
+        # 1. Landmark image: the slug from OpenAI feeds the media search
         venue = payload.get("venue", "")
-        landmark_slug = await self.openai.get_landmark_slug(venue)
-        # 2. Get images
-        landmark_url = await self.wp.search_media(landmark_slug)
-        overlay_url = await self.wp.search_media("overlay")
-        # 3. Speaker photos
-        import re
+        async def find_landmark():
+            landmark_slug = await self.openai.get_landmark_slug(venue)
+            return await self.wp.search_media(landmark_slug)
+
+        # 2. Summary and speaker credentials (single batched OpenAI call), then speaker photos
         speakers_data = payload.get("speakers", "")
         
         # Handle both string and list formats for speakers
@@ -30,126 +115,220 @@ class PosterGenerator:
         else:
             # If it's a string, use as is
             speakers_text = str(speakers_data) if speakers_data else ""
-        
-        if speakers_text.strip():  # Only process if speakers text is not empty
-            speaker_lines = (await self.openai.extract_speakers_and_credentials(speakers_text)).split("\n")
-            speaker_names = []
-            for line in speaker_lines:
-                # Remove leading numbering and punctuation (e.g., '1. ', '2) ', etc.)
-                name = re.sub(r"^\s*\d+\s*[\.|\)]?\s*", "", line)
-                name = name.split(",")[0].strip()
-                if name:
-                    speaker_names.append(name)
-        else:
-            speaker_lines = []
-            speaker_names = []
 
         async def find_speaker_photo(name):
             # Try several variants for best match, including first name only, ignore case, and missing middle names
-            import re
             base = name.strip()
             # Remove extra spaces and punctuation
-            base_clean = re.sub(r'[^a-zA-Z0-9 ]', '', base)
+            base_clean = _NAME_CLEAN_RE.sub('', base)
             parts = base_clean.split()
             first = parts[0] if parts else base_clean
             last = parts[-1] if len(parts) > 1 else ''
-            variants = set()
-            # Full name variants
-            variants.add(base)
-            variants.add(base.lower())
-            variants.add(base.upper())
-            variants.add(base.replace(" ", "-").lower())
-            variants.add(base.replace(" ", "_").lower())
-            variants.add(base.replace(" ", ""))
-            # First name only
-            variants.add(first)
-            variants.add(first.lower())
-            variants.add(first.upper())
+            # Ordered from most to least specific. WordPress media search is case-insensitive,
+            # so upper/lower-case spellings would only repeat the same query
+            variants = [
+                # Full name variants
+                base,
+                base.replace(" ", "-").lower(),
+                base.replace(" ", "_").lower(),
+                base.replace(" ", ""),
+            ]
             # First + last (skip middle)
             if first and last and first != last:
-                variants.add(f"{first} {last}")
-                variants.add(f"{first.lower()} {last.lower()}")
-                variants.add(f"{first}{last}")
-                variants.add(f"{first.lower()}{last.lower()}")
-            # Try all variants
+                variants += [f"{first} {last}", f"{first}{last}"]
+            # First name only
+            variants.append(first)
+            # Drop empty and case-insensitive duplicates, keeping the first spelling and the order
+            unique = {}
             for variant in variants:
-                photo = await self.wp.search_media(variant)
-                if photo:
-                    return photo
-            return None
+                if variant:
+                    unique.setdefault(variant.lower(), variant)
+            variants = list(unique.values())
+            # Most photos are found by the full name itself (WordPress search matches each word),
+            # so it is probed alone first and the other variants are only searched on a miss
+            photo = await self.wp.search_media(variants[0])
+            if photo:
+                return photo
+            # Look up the remaining variants concurrently and keep the most specific hit, so
+            # the chosen photo doesn't depend on which response happened to arrive first
+            results = await asyncio.gather(*(self.wp.search_media(variant) for variant in variants[1:]))
+            return next((photo for photo in results if photo), None)
+
+        async def summarize_and_find_photos():
+            summary, speakers = await self.openai.summarize_and_extract_speakers(payload.get("description", ""), speakers_text)
+            speaker_names = []
+            credentials = []
+            if speakers_text.strip():  # Only process if speakers text is not empty
+                for speaker in speakers:
+                    if not isinstance(speaker, dict):
+                        continue
+                    name = str(speaker.get("name") or "").strip()
+                    if not name:
+                        continue
+                    details = [str(speaker.get(key) or "").strip() for key in ("designation", "organization")]
+                    speaker_names.append(name)
+                    credentials.append(", ".join([name] + [d for d in details if d]))
+            speaker_photos = list(await asyncio.gather(*(find_speaker_photo(name) for name in speaker_names)))
+            return summary, credentials, speaker_photos
 
-        speaker_photos = [await find_speaker_photo(name) for name in speaker_names]
-        # 4. Text formatting
+        # 3. Event details
         # Normalize date to YYYY-MM-DD for OpenAI
-        import dateutil.parser
         raw_date = payload.get("date", "")
         try:
             parsed_date = dateutil.parser.parse(raw_date, dayfirst=False, yearfirst=False)
             norm_date = parsed_date.strftime("%Y-%m-%d")
         except Exception:
             norm_date = raw_date
-        # Get event details from OpenAI (separator should be handled in the OpenAI prompt, not as an argument)
-        event_details = await self.openai.format_event_details(norm_date, payload.get("time", ""), payload.get("venue", ""))
-        summary = await self.openai.summarize_description(payload.get("description", ""))
-        if speakers_text.strip():
-            credentials = (await self.openai.extract_speakers_and_credentials(speakers_text)).split("\n")
-        else:
-            credentials = []
+
+        # 4. None of these chains depend on each other, so their OpenAI and WordPress
+        # round trips all overlap; the overlay search runs during the landmark slug call
+        landmark_url, overlay_url, (summary, credentials, speaker_photos), event_details = await asyncio.gather(
+            find_landmark(),
+            self.wp.search_media("overlay"),
+            summarize_and_find_photos(),
+            # Separator should be handled in the OpenAI prompt, not as an argument
+            self.openai.format_event_details(norm_date, payload.get("time", ""), venue)
+        )
         # 5. Compose poster
-        poster_path = await self.compose_poster(
-            title=payload.get("title", ""),
-            summary=summary,
-            event_details=event_details,
+        poster_png = await self.compose_poster(
+            title=clip_text(title),
+            summary=clip_text(summary),
+            event_details=clip_text(event_details),
             speaker_photos=speaker_photos,
-            credentials=credentials,
+            credentials=[clip_text(credential) for credential in credentials],
             landmark_url=landmark_url,
             overlay_url=overlay_url
         )
         # 6. Upload poster
-        if not poster_path:
-            import logging
-            logging.error("Poster generation failed: compose_poster returned None. Check for missing images or file save errors.")
-            raise RuntimeError("Poster generation failed: compose_poster returned None. Check for missing images or file save errors.")
-        poster_url = await self.wp.upload_media(poster_path, os.path.basename(poster_path))
+        if not poster_png:
+            logger.error("Poster generation failed: compose_poster returned None. Check for missing images or encoding errors.")
+            raise RuntimeError("Poster generation failed: compose_poster returned None. Check for missing images or encoding errors.")
+        filename = f"{slugify(title) or 'poster'}-{uuid.uuid4().hex[:8]}.png"
+        poster_url = await self.wp.upload_media(poster_png, filename, "image/png")
         return [poster_url]
 
     async def compose_poster(self, title, summary, event_details, speaker_photos, credentials, landmark_url, overlay_url):
-        width, height = 1200, 1600
+        # All network I/O happens here; the Pillow work then runs in a worker thread
+        # (or process) so the event loop keeps serving other requests while a poster renders
+        # Photos are only shown as small circles, so large JPEGs are decoded at reduced scale
+        circle_size = speaker_circle_size(len([url for url in speaker_photos if url]))
+        async def open_speaker(url):
+            return (await self.imgsvc.open_image(url, (circle_size, circle_size))) if url else None
+
+        # Icons for the event details
+        icon_size = int(self.fonts["regular"].size * 1.1)
+        # Every download is independent, so the total wait is the slowest one rather than the sum
+        landmark, template, date_icon, time_icon, venue_icon, *speaker_images = await asyncio.gather(
+            # Landmarks repeat per venue, so they come cropped to the poster size from the cache
+            self.imgsvc.open_cropped(landmark_url, POSTER_SIZE),
+            self.load_template(overlay_url),
+            self.open_icon("date", (icon_size, icon_size)),
+            self.open_icon("time", (icon_size, icon_size)),
+            self.open_icon("venue", (icon_size, icon_size)),
+            *(open_speaker(url) for url in speaker_photos)
+        )
+        icons = [date_icon, time_icon, venue_icon]
+        render_args = dict(
+            title=title,
+            summary=summary,
+            event_details=event_details,
+            speaker_images=speaker_images,
+            credentials=credentials,
+            landmark=landmark,
+            template=template,
+            icons=icons
+        )
+        loop = asyncio.get_running_loop()
+        if isinstance(self.render_pool, ProcessPoolExecutor):
+            # A separate process isn't held back by the GIL; the images are pickled across
+            return await loop.run_in_executor(self.render_pool, _render_in_worker, render_args)
+        return await loop.run_in_executor(self.render_pool, partial(self.render_poster, **render_args))
+
+    async def preload(self):
+        # The overlay template and the event-detail icons are the same on every poster
+        icon_size = int(self.fonts["regular"].size * 1.1)
+        async def load_overlay_template():
+            overlay_url = await self.wp.search_media("overlay")
+            if overlay_url:
+                await self.load_template(overlay_url)
+        await asyncio.gather(
+            load_overlay_template(),
+            *(self.open_icon(search, (icon_size, icon_size)) for search in ("date", "time", "venue"))
+        )
+
+    async def open_icon(self, search, size):
+        url = await self.wp.search_media(search)
+        if not url:
+            return None
+        return await _icon_cache.get_or_set((url, size), lambda: self._load_icon(url, size))
+
+    async def _load_icon(self, url, size):
+        # Icons end up around 50px, where bilinear is indistinguishable from costlier filters
+        return (await self.imgsvc.open_image(url, size)).resize(size, Image.Resampling.BILINEAR)
+
+    async def load_template(self, overlay_url):
+        # The overlay and register line are the same on every poster, so they are
+        # composited once per overlay/register icon and reused
+        register_icon_url = await self.wp.search_media("register")
+        key = (overlay_url, register_icon_url)
+        return await _template_cache.get_or_set(key, lambda: self._build_template(overlay_url))
+
+    async def _build_template(self, overlay_url):
+        overlay, register_icon = await asyncio.gather(
+            self.imgsvc.open_cropped(overlay_url, POSTER_SIZE),
+            self.open_icon("register", (60, 60))
+        )
+        return await asyncio.to_thread(self.render_template, overlay, register_icon)
+
+    def render_template(self, overlay, register_icon):
+        width, height = POSTER_SIZE
+        margin_y = 80
+        font_regular = self.fonts["regular"]
+        # Text goes on its own transparent white layer that is then composited, so laying the
+        # template over a landmark gives the same pixels as drawing everything onto it directly
+        text_layer = Image.new("RGBA", POSTER_SIZE, (255, 255, 255, 0))
+        draw = ImageDraw.Draw(text_layer)
+        # Register line (move higher, with icon)
+        reg_y = height - margin_y - 210  # Move register line higher
+        reg_x = width//2
+        reg_text = "Register online at cmtassociation.org"
+        if register_icon:
+            reg_icon_w = register_icon.width
+            reg_text_w = text_width(font_regular, reg_text)
+            total_w = reg_icon_w + 16 + reg_text_w
+            reg_icon_x = int(reg_x - total_w//2)
+            overlay.alpha_composite(register_icon, dest=(reg_icon_x, reg_y))
+            draw.text((reg_icon_x + reg_icon_w + 16, reg_y + (register_icon.height - font_regular.size)//2), reg_text, font=font_regular, fill="white", anchor="la")
+        else:
+            draw.text((reg_x, reg_y), reg_text, font=font_regular, fill="white", anchor="ma")
+        overlay.alpha_composite(text_layer)
+        # Keep only the visible region; fully transparent margins need no blending per poster
+        box = overlay.getchannel("A").getbbox()
+        return (overlay.crop(box), box[:2]) if box else None
+
+    def render_poster(self, title, summary, event_details, speaker_images, credentials, landmark, template, icons):
+        width, height = POSTER_SIZE
         # Margins
         margin_x = 80
         margin_y = 80
         content_width = width - 2 * margin_x
         content_height = height - 2 * margin_y
 
-        img = self.imgsvc.open_image(landmark_url)
-        img = self.imgsvc.crop_to_aspect(img, (width, height))
-        overlay = self.imgsvc.open_image(overlay_url)
-        overlay = self.imgsvc.crop_to_aspect(overlay, (width, height))
-        img.alpha_composite(overlay)
+        # The landmark is already cropped to the poster size
+        img = landmark
+        if template:
+            template_img, template_pos = template
+            img.alpha_composite(template_img, dest=template_pos)
         draw = ImageDraw.Draw(img)
-        font_bold = ImageFont.truetype(settings.FONT_BOLD_PATH, 80)
-        font_regular = ImageFont.truetype(settings.FONT_REGULAR_PATH, 48)
-        font_small = ImageFont.truetype(settings.FONT_REGULAR_PATH, 32)  # Slightly smaller
-        font_small_bold = ImageFont.truetype(settings.FONT_BOLD_PATH, 32)  # Slightly smaller
-        # Even smaller fonts for 4 speakers to reduce clutter
-        font_tiny = ImageFont.truetype(settings.FONT_REGULAR_PATH, 24)
-        font_tiny_bold = ImageFont.truetype(settings.FONT_BOLD_PATH, 24)
+        font_bold = self.fonts["bold"]
+        font_regular = self.fonts["regular"]
+        font_small = self.fonts["small"]
+        font_small_bold = self.fonts["small_bold"]
+        font_tiny = self.fonts["tiny"]
+        font_tiny_bold = self.fonts["tiny_bold"]
         # Text wrapping utility
         def draw_wrapped_text(draw, text, font, x, y, max_width, line_spacing=1.2, anchor="la"):
-            words = text.split()
-            lines = []
-            current = ""
-            for word in words:
-                test = current + (" " if current else "") + word
-                bbox = font.getbbox(test)
-                w = bbox[2] - bbox[0]
-                if w > max_width and current:
-                    lines.append(current)
-                    current = word
-                else:
-                    current = test
-            if current:
-                lines.append(current)
+            lines = wrap_text(text, font, max_width)
             for i, line in enumerate(lines):
                 draw.text((x, y + i * int(font.size * line_spacing)), line, font=font, fill="white", anchor=anchor)
             return y + len(lines) * int(font.size * line_spacing)
@@ -161,14 +340,13 @@ class PosterGenerator:
         y_cursor += 20
         y_cursor = draw_wrapped_text(draw, summary, font_regular, margin_x, y_cursor, content_width)
         # Speaker grid
-        n = len([p for p in speaker_photos if p])  # Count only speakers with photos
+        n = len([p for p in speaker_images if p])  # Count only speakers with photos
         speaker_grid_bottom = y_cursor
         max_cred_y = y_cursor
         if n:
-            import math
             max_per_row = 4
             rows = math.ceil(n / max_per_row)
-            circle_size = 320 if n == 1 else 220 if n == 2 else 160
+            circle_size = speaker_circle_size(n)
             y = y_cursor + 40
             max_cred_y = y_cursor
             
@@ -185,40 +363,31 @@ class PosterGenerator:
                 x_positions = [round(gap + j * (circle_size + gap)) for j in range(speakers_in_row)]
                 
                 position_index = 0
-                for j in range(len(speaker_photos)):
+                for j in range(len(speaker_images)):
                     if position_index >= speakers_in_row:
                         break
                     if row * max_per_row + position_index >= n:
                         break
                         
-                    photo_url = speaker_photos[j]
+                    photo = speaker_images[j]
                     cred = credentials[j] if j < len(credentials) else ""
                     
-                    if not photo_url:
+                    if not photo:
                         # Create placeholder circle for missing speaker image
                         placeholder = Image.new("RGB", (circle_size, circle_size), (100, 100, 100))
                         placeholder_draw = ImageDraw.Draw(placeholder)
                         # Draw text "Speaker image not found" wrapped on the circle
                         placeholder_text = "Speaker\nimage\nnot found"
                         lines = placeholder_text.split('\n')
-                        text_font = ImageFont.truetype(settings.FONT_REGULAR_PATH, max(16, circle_size // 20))
+                        text_font = get_font(settings.FONT_REGULAR_PATH, max(16, circle_size // 20))
                         total_height = len(lines) * text_font.size
                         start_y = (circle_size - total_height) // 2
                         for i, line in enumerate(lines):
-                            bbox = text_font.getbbox(line)
-                            text_width = bbox[2] - bbox[0]
-                            text_x = (circle_size - text_width) // 2
-                            placeholder_draw.text((text_x, start_y + i * text_font.size), line, font=text_font, fill="white")
+                            placeholder_draw.text((circle_size // 2, start_y + i * text_font.size), line, font=text_font, fill="white", anchor="ma")
                         
-                        mask = Image.new("L", (circle_size, circle_size), 0)
-                        ImageDraw.Draw(mask).ellipse((0,0,circle_size,circle_size), fill=255)
-                        img.paste(placeholder, (x_positions[position_index], y), mask)
+                        self.imgsvc.paste_circle(img, placeholder, (x_positions[position_index], y), circle_size)
                     else:
-                        photo = self.imgsvc.open_image(photo_url)
-                        photo = self.imgsvc.crop_to_aspect(photo, (circle_size, circle_size))
-                        mask = Image.new("L", (circle_size, circle_size), 0)
-                        ImageDraw.Draw(mask).ellipse((0,0,circle_size,circle_size), fill=255)
-                        img.paste(photo, (x_positions[position_index], y), mask)
+                        self.imgsvc.paste_circle(img, photo, (x_positions[position_index], y), circle_size)
                     
                     # Speaker credentials (centered, name bold, wrap if too long)
                     if cred.strip():  # Only draw credentials if they exist
@@ -229,38 +398,18 @@ class PosterGenerator:
                         center_x = x_positions[position_index] + circle_size//2
                         max_cred_width = min(int(circle_size * 2), content_width)
                         
-                        def wrap_text(text, font, max_width):
-                            words = text.split()
-                            lines = []
-                            current = ""
-                            for word in words:
-                                test = current + (" " if current else "") + word
-                                bbox = font.getbbox(test)
-                                w = bbox[2] - bbox[0]
-                                if w > max_width and current:
-                                    lines.append(current)
-                                    current = word
-                                else:
-                                    current = test
-                            if current:
-                                lines.append(current)
-                            return lines
                         
-                        # Draw name (bold, wrap if needed)
+                        # Draw name (bold, wrap if needed); anchor "ma" centers each line on center_x
                         name_lines = wrap_text(name, cred_font_bold, max_cred_width)
                         for k, nline in enumerate(name_lines):
-                            nline_bbox = cred_font_bold.getbbox(nline)
-                            nline_w = nline_bbox[2] - nline_bbox[0]
-                            draw.text((center_x - nline_w//2, cred_y + k * int(cred_font_bold.size * 1.1)), nline, font=cred_font_bold, fill="white")
+                            draw.text((center_x, cred_y + k * int(cred_font_bold.size * 1.1)), nline, font=cred_font_bold, fill="white", anchor="ma")
                         offset_y = cred_y + len(name_lines) * int(cred_font_bold.size * 1.1)
                         
                         # Draw rest (wrap if needed)
                         if rest:
                             rest_lines = wrap_text(rest, cred_font, max_cred_width)
                             for k, rline in enumerate(rest_lines):
-                                rline_bbox = cred_font.getbbox(rline)
-                                rline_w = rline_bbox[2] - rline_bbox[0]
-                                draw.text((center_x - rline_w//2, offset_y + k * int(cred_font.size * 1.1)), rline, font=cred_font, fill="white")
+                                draw.text((center_x, offset_y + k * int(cred_font.size * 1.1)), rline, font=cred_font, fill="white", anchor="ma")
                             cred_end_y = offset_y + len(rest_lines) * int(cred_font.size * 1.1)
                         else:
                             cred_end_y = offset_y
@@ -282,25 +431,13 @@ class PosterGenerator:
         details_y = max(speaker_grid_bottom + 50, max_cred_y + 50)
 
         # Event details (date, time, venue on separate lines, left aligned below speaker grid, with icons)
-        # Fetch icons from WordPress
         icon_size = int(font_regular.size * 1.1)
-        date_icon_url = await self.wp.search_media("date")
-        time_icon_url = await self.wp.search_media("time")
-        venue_icon_url = await self.wp.search_media("venue")
-        icons = []
-        for url in [date_icon_url, time_icon_url, venue_icon_url]:
-            if url:
-                icon = self.imgsvc.open_image(url).resize((icon_size, icon_size))
-                icons.append(icon)
-            else:
-                icons.append(None)
         # Robustly extract date, time, venue from OpenAI output like:
         # 'Date: ..., Time: ..., Venue: ...'
         details_lines = []
-        import re as _re
         s = event_details.strip()
         # Try to match the pattern
-        m = _re.match(r"Date:\s*(.*?),\s*Time:\s*(.*?),\s*Venue:\s*(.*)", s)
+        m = _DETAILS_RE.match(s)
         if m:
             details_lines = [m.group(1).strip(), m.group(2).strip(), m.group(3).strip()]
         else:
@@ -332,51 +469,33 @@ class PosterGenerator:
             # For venue (last line), wrap text if too long
             if i == 2:
                 # Wrap venue text to fit within content_width
-                def wrap_text(text, font, max_width):
-                    words = text.split()
-                    lines = []
-                    current = ""
-                    for word in words:
-                        test = current + (" " if current else "") + word
-                        bbox = font.getbbox(test)
-                        w = bbox[2] - bbox[0]
-                        if w > max_width and current:
-                            lines.append(current)
-                            current = word
-                        else:
-                            current = test
-                    if current:
-                        lines.append(current)
-                    return lines
                 venue_lines = wrap_text(value, font_regular, content_width - (x - margin_x))
                 for j, vline in enumerate(venue_lines):
                     draw.text((x, y + j * int(font_regular.size * 1.2)), vline, font=font_regular, fill="white", anchor="la")
             else:
                 draw.text((x, y + (icon_size - font_regular.size)//2), value, font=font_regular, fill="white", anchor="la")
 
-        # Register line (move higher, with icon)
-        register_icon_url = await self.wp.search_media("register")
-        register_icon = self.imgsvc.open_image(register_icon_url).resize((60, 60)) if register_icon_url else None
-        reg_y = height - margin_y - 210  # Move register line higher
-        reg_x = width//2
-        reg_text = "Register online at cmtassociation.org"
-        if register_icon:
-            reg_icon_w = register_icon.width
-            reg_text_bbox = font_regular.getbbox(reg_text)
-            reg_text_w = reg_text_bbox[2] - reg_text_bbox[0]
-            total_w = reg_icon_w + 16 + reg_text_w
-            reg_icon_x = reg_x - total_w//2
-            img.paste(register_icon, (reg_icon_x, reg_y), register_icon)
-            draw.text((reg_icon_x + reg_icon_w + 16, reg_y + (register_icon.height - font_regular.size)//2), reg_text, font=font_regular, fill="white", anchor="la")
-        else:
-            draw.text((reg_x, reg_y), reg_text, font=font_regular, fill="white", anchor="ma")
-        # Save
-        import logging
+        # Encode in memory; compress_level=1 trades a slightly larger file for much less zlib CPU
         try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp:
-                img.save(tmp.name, format="PNG")
-                logging.info(f"Poster image saved to: {tmp.name}")
-                return tmp.name
+            # Over an opaque landmark the alpha channel is all 255; dropping it leaves the
+            # encoder a quarter less data to filter and compress
+            if img.getchannel("A").getextrema() == (255, 255):
+                img = img.convert("RGB")
+            buf = io.BytesIO()
+            img.save(buf, format="PNG", compress_level=1)
+            logger.info("Poster image encoded (%s bytes)", buf.tell())
+            return buf.getvalue()
         except Exception as e:
-            logging.error(f"Failed to save poster image: {e}")
+            logger.error("Failed to encode poster image: %s", e)
             return None
+
+# Generator used inside render worker processes, set up by init_render_worker
+_worker_generator = None
+
+def init_render_worker():
+    # Rendering needs fonts but no HTTP clients, so each worker builds its own generator once
+    global _worker_generator
+    _worker_generator = PosterGenerator(None, None, ImageService(None))
+
+def _render_in_worker(render_args):
+    return _worker_generator.render_poster(**render_args)
@@ -1,24 +1,184 @@
 from PIL import Image, ImageDraw, ImageFont
-import io
+from collections import OrderedDict
+from pathlib import Path
+import asyncio
+import hashlib
+import orjson
 import os
+import time
+import uuid
 import logging
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Already cropped/resized images keyed by (url, size) -> (expiry, image), least recently
+# used first; callers get a copy. A 1200x1600 RGBA image is ~7.7 MB, so only a few are
+# kept, and entries expire after IMAGE_CACHE_TTL so the source goes back through
+# download() and is revalidated.
+_cropped_cache = OrderedDict()
+_CROPPED_CACHE_SIZE = 4
+# Circular "L" masks keyed by diameter; only read by paste(), so safe to share
+_mask_cache = {}
+
 class ImageService:
-    def open_image(self, path_or_url):
-        logger.info(f"Opening image: {path_or_url}")
-        if path_or_url.startswith("http"):
-            import requests
-            resp = requests.get(path_or_url)
-            img = Image.open(io.BytesIO(resp.content)).convert("RGBA")
-        else:
-            img = Image.open(path_or_url).convert("RGBA")
-        logger.info(f"Image opened: {path_or_url} (size: {img.size})")
+    def __init__(self, client):
+        # Shared httpx.AsyncClient used for downloading remote images
+        self.client = client
+
+    async def open_image(self, path_or_url, target_size=None):
+        # target_size is the smallest size the caller will scale the image down to
+        logger.info("Opening image: %s", path_or_url)
+        path = await self.download(path_or_url) if path_or_url.startswith("http") else path_or_url
+        # Decoding is CPU work, so it runs in a thread and concurrent downloads keep flowing
+        img = await asyncio.to_thread(self._decode, path, target_size)
+        logger.info("Image opened: %s (size: %s)", path_or_url, img.size)
+        return img
+
+    def _decode(self, path, target_size=None):
+        # Decode straight from the file; load() reads the pixels and closes it
+        img = Image.open(path)
+        if target_size:
+            # JPEGs can be scaled by 1/2, 1/4 or 1/8 while decoding, keeping both sides
+            # >= target_size; other formats ignore this
+            img.draft("RGB", tuple(target_size))
+        img.load()
+        # Only convert when needed; convert() always allocates a full copy
+        if img.mode != "RGBA":
+            img = img.convert("RGBA")
         return img
 
+    async def download(self, url):
+        # Downloads are kept on disk, keyed by a hash of the URL, and the cached file's
+        # path is returned. Once older than IMAGE_CACHE_TTL an entry is revalidated with
+        # a conditional GET, so an unchanged image costs a 304 instead of a full download.
+        cache_path = Path(settings.IMAGE_CACHE_DIR) / hashlib.blake2b(url.encode(), digest_size=16).hexdigest()
+        meta_path = cache_path.with_suffix(".json")
+        cached = await asyncio.to_thread(self._read_meta, cache_path, meta_path)
+        headers = {}
+        if cached:
+            meta, age = cached
+            if age < settings.IMAGE_CACHE_TTL:
+                logger.info("Image cache hit: %s", url)
+                return cache_path
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        async with self.client.stream("GET", url, headers=headers) as resp:
+            if cached and resp.status_code == 304:
+                logger.info("Image not modified: %s", url)
+                await asyncio.to_thread(os.utime, cache_path)
+                return cache_path
+            resp.raise_for_status()
+            meta = {"etag": resp.headers.get("ETag"), "last_modified": resp.headers.get("Last-Modified")}
+            # Stream the body into a temporary file rather than holding it in memory; every
+            # file operation runs in a thread, so the event loop never blocks on disk
+            tmp_path = self._tmp_path(cache_path)
+            f = await asyncio.to_thread(self._open_tmp, tmp_path)
+            try:
+                try:
+                    async for chunk in resp.aiter_bytes(65536):
+                        await asyncio.to_thread(f.write, chunk)
+                finally:
+                    await asyncio.to_thread(f.close)
+            except BaseException:
+                await asyncio.to_thread(tmp_path.unlink, missing_ok=True)
+                raise
+        await asyncio.to_thread(self._commit_cache, tmp_path, cache_path, meta_path, meta)
+        return cache_path
+
+    def _tmp_path(self, path):
+        return path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+
+    def _read_meta(self, cache_path, meta_path):
+        try:
+            age = time.time() - cache_path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+        try:
+            meta = orjson.loads(meta_path.read_bytes())
+        except (FileNotFoundError, ValueError):
+            meta = {}
+        return meta, age
+
+    def _open_tmp(self, tmp_path):
+        tmp_path.parent.mkdir(parents=True, exist_ok=True)
+        return open(tmp_path, "wb")
+
+    def _commit_cache(self, tmp_path, cache_path, meta_path, meta):
+        # Written to temporary files and renamed into place, so readers never see a partial file
+        tmp_meta_path = self._tmp_path(meta_path)
+        try:
+            tmp_meta_path.write_bytes(orjson.dumps(meta))
+            os.replace(tmp_meta_path, meta_path)
+            os.replace(tmp_path, cache_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+            tmp_meta_path.unlink(missing_ok=True)
+        self._evict_cache(cache_path.parent, keep=cache_path)
+
+    def _evict_cache(self, cache_dir, keep):
+        # Keep the directory under IMAGE_CACHE_MAX_BYTES by deleting the entries with the oldest
+        # mtime (last download or 304 revalidation) first, image and .json sidecar together
+        entries = []
+        total = 0
+        for path in cache_dir.iterdir():
+            if path.suffix or path == keep:
+                continue
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        total += keep.stat().st_size
+        if total <= settings.IMAGE_CACHE_MAX_BYTES:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            path.unlink(missing_ok=True)
+            path.with_suffix(".json").unlink(missing_ok=True)
+            total -= size
+            if total <= settings.IMAGE_CACHE_MAX_BYTES:
+                break
+
+    async def open_cropped(self, url, target_size):
+        key = (url, tuple(target_size))
+        entry = _cropped_cache.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            img = await asyncio.to_thread(self.crop_to_aspect, await self.open_image(url, target_size), target_size)
+            _cropped_cache[key] = (time.monotonic() + settings.IMAGE_CACHE_TTL, img)
+            _cropped_cache.move_to_end(key)
+            if len(_cropped_cache) > _CROPPED_CACHE_SIZE:
+                _cropped_cache.popitem(last=False)
+        else:
+            img = entry[1]
+            _cropped_cache.move_to_end(key)
+        return img.copy()
+
+    def circle_mask(self, size):
+        mask = _mask_cache.get(size)
+        if mask is None:
+            # Rasterize at 4x and downsample, which gives the circle an antialiased edge
+            big = Image.new("L", (size * 4, size * 4), 0)
+            ImageDraw.Draw(big).ellipse((0, 0, size * 4 - 1, size * 4 - 1), fill=255)
+            mask = big.resize((size, size), Image.Resampling.LANCZOS)
+            _mask_cache[size] = mask
+        return mask
+
+    def paste_circle(self, dst, src, xy, size):
+        # Cover-crop and resample src straight to the circle size (one pass), then paste it
+        # through the cached circle mask; sources already at that size go straight in
+        if src.size != (size, size):
+            src = self.crop_to_aspect(src, (size, size))
+        dst.paste(src, xy, self.circle_mask(size))
+
     def crop_to_aspect(self, img, target_size):
-        logger.info(f"Cropping image to fill aspect ratio {target_size}")
+        logger.info("Cropping image to fill aspect ratio %s", target_size)
+        # Callers composite the result, so guarantee RGBA once here
+        if img.mode != "RGBA":
+            img = img.convert("RGBA")
         target_w, target_h = target_size
         src_w, src_h = img.size
         src_aspect = src_w / src_h
@@ -27,15 +187,15 @@ class ImageService:
             # Source is wider than target: crop width
             new_w = int(target_aspect * src_h)
             left = (src_w - new_w) // 2
-            img = img.crop((left, 0, left + new_w, src_h))
+            box = (left, 0, left + new_w, src_h)
         else:
             # Source is taller than target: crop height
             new_h = int(src_w / target_aspect)
             top = (src_h - new_h) // 2
-            img = img.crop((0, top, src_w, top + new_h))
-        img = img.resize(target_size, Image.Resampling.LANCZOS)
-        return img
+            box = (0, top, src_w, top + new_h)
+        # Resample only the source box: crop and resize in one pass, no intermediate image
+        return img.resize(tuple(target_size), Image.Resampling.LANCZOS, box=box)
 
     def save_image(self, img, path):
-        logger.info(f"Saving image to {path}")
+        logger.info("Saving image to %s", path)
         img.save(path, format="PNG")
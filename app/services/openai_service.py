@@ -1,34 +1,40 @@
-import httpx
+import orjson
 import logging
+from app.core.cache import AsyncTTLCache
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# A venue's city/country doesn't change, and the same venues host event after event
+_landmark_cache = AsyncTTLCache(ttl=settings.LANDMARK_CACHE_TTL)
+
 class OpenAIService:
-    def __init__(self):
+    def __init__(self, client):
+        # Shared httpx.AsyncClient that already carries the Azure api-key header
+        self.client = client
         self.endpoint = settings.AZURE_OPENAI_ENDPOINT
-        self.api_key = settings.AZURE_OPENAI_API_KEY
 
-    async def ask(self, prompt, system=None):
-        headers = {
-            "Content-Type": "application/json",
-            "api-key": self.api_key
-        }
+    async def ask(self, prompt, system=None, json_mode=False):
         data = {
             "messages": [
                 {"role": "system", "content": system or "You are a helpful assistant."},
                 {"role": "user", "content": prompt}
             ]
         }
-        logger.info(f"Calling OpenAI API with prompt: {prompt[:100]}...")
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(self.endpoint, json=data, headers=headers)
-            resp.raise_for_status()
-            result = resp.json()["choices"][0]["message"]["content"]
-            logger.info(f"OpenAI API response: {result[:100]}...")
-            return result
+        if json_mode:
+            data["response_format"] = {"type": "json_object"}
+        logger.info("Calling OpenAI API with prompt: %s...", prompt[:100])
+        resp = await self.client.post(self.endpoint, content=orjson.dumps(data), headers={"Content-Type": "application/json"})
+        resp.raise_for_status()
+        result = orjson.loads(resp.content)["choices"][0]["message"]["content"]
+        logger.info("OpenAI API response: %s...", result[:100])
+        return result
 
     async def get_landmark_slug(self, venue):
+        key = " ".join(venue.lower().split())
+        return await _landmark_cache.get_or_set(key, lambda: self._get_landmark_slug(venue))
+
+    async def _get_landmark_slug(self, venue):
         prompt = f"Given the venue '{venue}', return the city and country in the format 'city-country' (lowercase, hyphens, no spaces) for image lookup. Only output the slug."
         return (await self.ask(prompt)).strip()
 
@@ -36,20 +42,25 @@ class OpenAIService:
         prompt = f"Format the following date, time, and venue for a poster. Output as: Date: ..., Time: ..., Venue: ...\nDate: {date}\nTime: {time}\nVenue: {venue}"
         return (await self.ask(prompt)).strip()
 
-    async def summarize_description(self, description):
+    async def summarize_and_extract_speakers(self, description, speakers_text):
+        # One JSON-mode completion for both the summary and every speaker's credentials
         prompt = (
-            "Summarize the following event description for a poster. "
+            "Return a JSON object with the keys \"summary\" and \"speakers\".\n"
+            "\"summary\": summarize the event description below for a poster. "
             "Exclude date, time, venue, and links. Focus on what the meeting/event is and why it is important. "
-            "The summary must be concise, not more than 35 words, and should fit in 3 to 4 lines.\n\n"
-            f"{description}"
-        )
-        return (await self.ask(prompt)).strip()
-
-    async def extract_speakers_and_credentials(self, speakers_text):
-        prompt = (
-            "From the following text, extract the list of speakers and generate a short credential for each, suitable for a poster. "
-            "For each speaker, only output their name and their main designation/role and organization, nothing else. "
-            "Do not add numbering or bullet points. Output as: Name, Designation, Organization.\n\n"
-            f"{speakers_text}"
+            "The summary must be concise, not more than 35 words, and should fit in 3 to 4 lines.\n"
+            "\"speakers\": from the speakers text below, extract the list of speakers as objects with the keys "
+            "\"name\", \"designation\" and \"organization\", suitable for a poster. "
+            "Only use their main designation/role and organization. Use an empty list if there are no speakers.\n\n"
+            f"Event description:\n{description}\n\n"
+            f"Speakers text:\n{speakers_text}"
         )
-        return (await self.ask(prompt)).strip()
+        result = orjson.loads(await self.ask(prompt, json_mode=True))
+        # JSON mode only guarantees valid JSON, not this shape, so anything unexpected is dropped
+        if not isinstance(result, dict):
+            result = {}
+        summary = result.get("summary")
+        speakers = result.get("speakers")
+        summary = summary.strip() if isinstance(summary, str) else ""
+        speakers = [speaker for speaker in speakers if isinstance(speaker, dict)] if isinstance(speakers, list) else []
+        return summary, speakers
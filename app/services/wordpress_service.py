@@ -1,38 +1,44 @@
-import httpx
+import asyncio
 import logging
+import orjson
+from app.core.cache import AsyncTTLCache
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Media lookups (overlay, icons, landmarks, speakers) repeat across requests
+_media_cache = AsyncTTLCache(ttl=settings.MEDIA_CACHE_TTL)
+
 class WordPressService:
-    def __init__(self):
-        self.base_url = settings.WORDPRESS_URL
-        self.username = settings.WORDPRESS_USERNAME
-        self.password = settings.WORDPRESS_PASSWORD
-        self.auth = (self.username, self.password)
+    def __init__(self, client):
+        # Shared httpx.AsyncClient configured with the WordPress base URL and credentials
+        self.client = client
+        # Speaker name variants fan out into many searches; cap how many hit WordPress at once
+        self._search_slots = asyncio.Semaphore(settings.WP_SEARCH_CONCURRENCY)
 
     async def search_media(self, search):
-        url = f"{self.base_url}/wp-json/wp/v2/media?search={search}"
-        logger.info(f"Searching WordPress media for: {search}")
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(url, auth=self.auth)
-            resp.raise_for_status()
-            results = resp.json()
-            if results:
-                logger.info(f"Found media: {results[0]['source_url']}")
-                return results[0]["source_url"]
-            logger.warning(f"No media found for: {search}")
-            return None
+        return await _media_cache.get_or_set(search, lambda: self._search_media(search))
+
+    async def _search_media(self, search):
+        async with self._search_slots:
+            logger.info("Searching WordPress media for: %s", search)
+            resp = await self.client.get("/wp-json/wp/v2/media", params={"search": search})
+        resp.raise_for_status()
+        results = orjson.loads(resp.content)
+        if results:
+            logger.info("Found media: %s", results[0]['source_url'])
+            return results[0]["source_url"]
+        logger.warning("No media found for: %s", search)
+        return None
 
-    async def upload_media(self, file_path, filename):
-        url = f"{self.base_url}/wp-json/wp/v2/media"
-        headers = {"Content-Disposition": f"attachment; filename={filename}"}
-        logger.info(f"Uploading poster to WordPress: {filename}")
-        with open(file_path, "rb") as f:
-            data = f.read()
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(url, headers=headers, content=data, auth=self.auth)
-            resp.raise_for_status()
-            uploaded_url = resp.json()["source_url"]
-            logger.info(f"Poster uploaded to: {uploaded_url}")
-            return uploaded_url
+    async def upload_media(self, data, filename, content_type):
+        headers = {
+            "Content-Disposition": f"attachment; filename={filename}",
+            "Content-Type": content_type
+        }
+        logger.info("Uploading poster to WordPress: %s", filename)
+        resp = await self.client.post("/wp-json/wp/v2/media", headers=headers, content=data)
+        resp.raise_for_status()
+        uploaded_url = orjson.loads(resp.content)["source_url"]
+        logger.info("Poster uploaded to: %s", uploaded_url)
+        return uploaded_url